@@ -7,42 +7,280 @@ Includes functions for processing solution logs, including the following:
     -Rewrite solution log to include additional solution vector elements.
     -Rewrite solution log to trim solution vector elements.
     -Clear unknown entries from solution log.
+    -Convert solution logs to and from a packed binary format.
     -Look up a solution log.
     -Rewind a search to a specified iteration.
 """
 
+from array import array
+import collections
+import concurrent.futures
+import csv
+import itertools
+import mmap
+import operator
+import os
+import struct
+import sys
+
+# Number of real-valued columns of a solution log (objective and user cost
+# components)
+_COLUMNS = 6
+
+# Format of a solution log row (solution string, feasibility status, and
+# real-valued columns), applied to a whole row in a single formatting call
+_ROW_FORMAT = "%s\t%d\t" + "%.15f\t"*_COLUMNS
+_ROW_BYTES = _ROW_FORMAT.encode()
+
+# First line of a packed (binary) solution log
+_PACKED_HEADER = b"packed solution log v1\n"
+
+# Buffer size (bytes) for reading and writing solution logs
+_BUFFER = 1 << 20
+
+# Number of solution log rows joined and written at once
+_BATCH = 1000
+
+# Cached solution log row offsets, keyed by file path (see _log_offsets());
+# only the most recently indexed log is kept
+_offsets = {}
+
+#==============================================================================
+def _read_log(log_in):
+    """Reads a solution log into column arrays.
+
+    Requires a positional argument for the solution log file path.
+
+    Returns a tuple containing the following elements:
+        comment -- Comment line of the log (including its newline).
+        keys -- List of solution strings.
+        feas -- Array of feasibility statuses (-1, 0, or 1), stored as signed
+            bytes.
+        cols -- List of arrays of the objective and user cost component
+            columns, with one array per column.
+
+    The log is stored column-wise, with entry i of every column belonging to
+    solution keys[i].
+    """
+
+    keys = []
+    feas = array('b')
+    cols = [array('d') for i in range(_COLUMNS)]
+
+    with open(log_in, 'r') as f:
+
+        comment = f.readline() # get comment line
+
+        # Append each row to the columns as it is tokenized
+        for row in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+            keys.append(row[0])
+            feas.append(int(row[1]))
+            for c, value in zip(cols, row[2:2+_COLUMNS]):
+                c.append(float(value))
+
+    return comment, keys, feas, cols
+
+#==============================================================================
+def _write_log(log_out, comment, keys, feas, cols):
+    """Writes column arrays to a solution log.
+
+    Requires the following positional arguments:
+        log_out -- File path for the solution log.
+        comment -- Comment line of the log (including its newline).
+        keys -- List of solution strings.
+        feas -- Array of feasibility statuses.
+        cols -- List of arrays of the objective and user cost component
+            columns, as returned by _read_log().
+    """
+
+    fmt = _ROW_FORMAT + "\n"
+    rows = map(fmt.__mod__, zip(keys, feas, *cols))
+
+    # Format, encode, and write the rows in batches
+    with open(log_out, 'wb', buffering=_BUFFER) as f:
+        f.write((comment.rstrip('\r\n') + '\n').encode())
+        batch = ''.join(itertools.islice(rows, _BATCH))
+        while len(batch) > 0:
+            f.write(batch.encode())
+            batch = ''.join(itertools.islice(rows, _BATCH))
+
+        print("Output log written.")
+
 #==============================================================================
-def _str2vec(s, delim='_'):
-    """Converts a solution string to a solution vector.
+def _read_packed(log_in):
+    """Reads a packed solution log into column arrays.
+
+    Requires a positional argument for the packed solution log file path.
 
-    Requires a positional argument for the solution string.
+    Returns the same tuple as _read_log().
 
-    Accepts a keyword argument 'delim' to specify the delimiter (default '_').
+    A packed log consists of the _PACKED_HEADER marker line, the comment line,
+    the number of rows and the byte length of the solution string block (as
+    little-endian 64-bit integers), the newline-delimited solution strings,
+    the feasibility column as signed bytes, and finally each real-valued
+    column as little-endian 64-bit floats.
     """
 
-    temp = s.split(sep=delim)
+    with open(log_in, 'rb', buffering=_BUFFER) as f:
 
-    return [int(n) for n in temp]
+        if f.readline() != _PACKED_HEADER:
+            raise ValueError("not a packed solution log: " + str(log_in))
+
+        comment = f.readline().decode() # get comment line
+        rows, size = struct.unpack("<QQ", f.read(16))
+
+        # Read solution strings
+        keys = f.read(size).decode().split('\n') if rows > 0 else []
+        if len(keys) != rows:
+            raise ValueError("corrupted packed solution log: " + str(log_in))
+
+        # Read each column as a single block
+        feas = array('b')
+        feas.fromfile(f, rows)
+        cols = []
+        for i in range(_COLUMNS):
+            c = array('d')
+            c.fromfile(f, rows)
+            if sys.byteorder == 'big':
+                c.byteswap()
+            cols.append(c)
+
+    return comment, keys, feas, cols
 
 #==============================================================================
-def _vec2str(v, delim='_'):
-    """Converts a solution vector to a solution string.
+def _write_packed(log_out, comment, keys, feas, cols):
+    """Writes column arrays to a packed solution log.
+
+    Requires the same positional arguments as _write_log(). See _read_packed()
+    for the file layout.
+    """
 
-    Requires a positional argument for the solution vector.
+    block = '\n'.join(keys).encode() # solution string block
 
-    Accepts a keyword argument 'delim' to specify the delimiter (default '_').
+    with open(log_out, 'wb', buffering=_BUFFER) as f:
+        f.write(_PACKED_HEADER)
+        f.write((comment.rstrip('\r\n') + '\n').encode())
+        f.write(struct.pack("<QQ", len(keys), len(block)))
+        f.write(block)
+
+        # Write each column as a single block
+        feas.tofile(f)
+        for c in cols:
+            if sys.byteorder == 'big':
+                c = array('d', c)
+                c.byteswap()
+            c.tofile(f)
+
+        print("Output log written.")
+
+#==============================================================================
+def _merge_rows(row1, row2, feas_pick, col_pick):
+    """Combines two conflicting solution log rows.
+
+    Requires the following positional arguments:
+        row1 -- Solution log row (as bytes, without its newline).
+        row2 -- Solution log row for the same solution.
+        feas_pick -- Function used to choose between the two feasibility
+            statuses (min or max).
+        col_pick -- Function used to choose between the two values of each
+            real-valued column (min or max).
+
+    Returns the combined row as bytes, without a newline.
     """
 
-    temp = ""
-    for i in range(len(v)):
-        temp += str(v[i])
-        if i < len(v)-1:
-            temp += delim
+    cur = row1.split(b'\t')
+    row = row2.split(b'\t')
 
-    return temp
+    return _ROW_BYTES % (cur[0], feas_pick(int(cur[1]), int(row[1])),
+                         *map(col_pick, map(float, cur[2:2+_COLUMNS]),
+                              map(float, row[2:2+_COLUMNS])))
 
 #==============================================================================
-def log_merge(log_in1, log_in2, log_out, highest=True):
+def _next_row(f, prev):
+    """Reads the next row of a sorted solution log.
+
+    Requires the following positional arguments:
+        f -- Solution log file opened in binary mode.
+        prev -- Solution string of the previous row (as bytes), or None for
+            the first row.
+
+    Returns a tuple containing the row's solution string and the row itself
+    (both as bytes, without the newline), or (None, None) at the end of the
+    file.
+
+    Raises a ValueError if the row's solution string does not come strictly
+    after the previous one, since the log is then not sorted (or repeats a
+    solution).
+    """
+
+    line = f.readline()
+    if len(line) == 0:
+        return None, None
+
+    line = line.rstrip(b'\r\n')
+    key = line.split(b'\t', 1)[0]
+
+    if prev is not None and key <= prev:
+        raise ValueError("solution log is not sorted: " + str(f.name))
+
+    return key, line
+
+#==============================================================================
+def _merge_sorted(log_in1, log_in2, log_out, feas_pick, col_pick):
+    """Merges two sorted solution logs in a single streaming pass.
+
+    Requires the following positional arguments:
+        log_in1 -- File path to an existing sorted solution log.
+        log_in2 -- File path to an existing sorted solution log.
+        log_out -- File path for the combined log file.
+        feas_pick -- Function used to choose between conflicting feasibility
+            statuses (min or max).
+        col_pick -- Function used to choose between conflicting real-valued
+            column values (min or max).
+
+    Returns a tuple containing the number of entries in the combined log and
+    the number of conflicting entries resolved.
+
+    Both logs are read one row at a time, always advancing the one whose
+    current solution string comes first, so only the current row of each log
+    is ever held in memory. The combined log is sorted as well. Raises a
+    ValueError if either log turns out not to be sorted.
+    """
+
+    entries = 0
+    conflicts = 0
+
+    with open(log_in1, 'rb', buffering=_BUFFER) as f1:
+        with open(log_in2, 'rb', buffering=_BUFFER) as f2:
+            with open(log_out, 'wb', buffering=_BUFFER) as fo:
+
+                # Copy comment line
+                fo.write(f1.readline().rstrip(b'\r\n') + b'\n')
+                f2.readline() # skip comment line
+
+                key1, row1 = _next_row(f1, None)
+                key2, row2 = _next_row(f2, None)
+
+                # Write whichever row comes first until both logs run out
+                while key1 is not None or key2 is not None:
+                    entries += 1
+                    if key2 is None or (key1 is not None and key1 < key2):
+                        fo.write(row1 + b'\n')
+                        key1, row1 = _next_row(f1, key1)
+                    elif key1 is None or key2 < key1:
+                        fo.write(row2 + b'\n')
+                        key2, row2 = _next_row(f2, key2)
+                    else:
+                        conflicts += 1
+                        fo.write(_merge_rows(row1, row2, feas_pick, col_pick)
+                                 + b'\n')
+                        key1, row1 = _next_row(f1, key1)
+                        key2, row2 = _next_row(f2, key2)
+
+    return entries, conflicts
+
+#==============================================================================
+def log_merge(log_in1, log_in2, log_out, highest=True, assume_sorted=False):
     """Merges the contents of two solution logs into a third combined log.
 
     Requires the following positional arguments:
@@ -56,77 +294,150 @@ def log_merge(log_in1, log_in2, log_out, highest=True):
             objective and user cost values. If False, the minimum is taken.
             Defaults to True, which corresponds to a conservative estimate of
             the objective and feasibility.
+        assume_sorted -- Selects whether both input logs can be assumed to be
+            sorted by solution string (in byte order, with no repeated
+            solutions, as produced by "LC_ALL=C sort" on the rows below the
+            comment line). If True, the logs are merged in a single streaming
+            pass without holding either in memory, and the output is sorted as
+            well. Raises a ValueError if either log turns out not to be
+            sorted. Defaults to False, which accepts logs in any order.
 
     This function reads the contents of the two input solution logs and
     produces a third solution log that includes the union of their entries. If
     any solution is present in both logs, the 'highest' keyword argument
     specifies whether we keep the higher or the lower of the two logged
-    objective or user cost values.
+    objective or user cost values. A solution repeated within the first log is
+    collapsed to a single entry at its first position, taking the values of
+    its last copy.
     """
 
-    # Initialize comment line and solution dictionary
-    comment = ""
-    dic = {}
+    # Decide whether to take the higher or lower value of conflicting entries
+    if highest:
+        feas_pick, col_pick = min, max
+    else:
+        feas_pick, col_pick = max, min
+
+    # Sorted logs can be merged without reading either into memory
+    if assume_sorted:
+        entries, conflicts = _merge_sorted(log_in1, log_in2, log_out,
+                                           feas_pick, col_pick)
+        print("Combined log contains %d entries (%d conflicting entries "
+              "resolved)." % (entries, conflicts))
+        print("Output log written.")
+        return
 
-    # Read first log into dictionary
-    with open(log_in1, 'r') as f:
+    # Read first log, keeping each row's original bytes
+    with open(log_in1, 'rb', buffering=_BUFFER) as f:
 
         comment = f.readline() # get comment line
-
-        for line in f:
-            row = line.split()
-            dic[row[0]] = [int(row[1]), float(row[2]), float(row[3]),
-               float(row[4]), float(row[5]), float(row[6]), float(row[7])]
+        rows = f.read().splitlines()
 
         print("Log 1 read.")
 
+    # Index the rows by solution string, building the dictionary in one call
+    keys = [row.split(b'\t', 1)[0] for row in rows]
+    index = dict(zip(keys, range(len(keys))))
+
+    # Collapse repeated solutions, keeping the first position and last values
+    if len(index) < len(rows):
+        index = {}
+        kept = []
+        for key, row in zip(keys, rows):
+            i = index.get(key)
+            if i is None:
+                index[key] = len(kept)
+                kept.append(row)
+            else:
+                kept[i] = row
+        rows = kept
+    del keys
+
     conflicts = 0
 
-    # Read second log into same dictionary
-    with open(log_in2, 'r') as f:
+    # Merge second log into the first, streaming it in large chunks so that
+    # only its new rows are ever kept in memory
+    with open(log_in2, 'rb', buffering=_BUFFER) as f:
 
         f.readline() # skip comment line
 
-        for line in f:
-            row = line.split()
-            row = [row[0], int(row[1]), float(row[2]), float(row[3]),
-                   float(row[4]), float(row[5]), float(row[6]), float(row[7])]
-
-            # Test if this is a duplicate entry
-            if row[0] in dic.keys():
-
-                # If so, decide whether to take the higher or lower value
-                conflicts += 1
-                if (highest == True):
-                    dic[row[0]] = ([min(dic[row[0]][0], row[1])] +
-                       [max(dic[row[0]][i], row[i+1]) for i in range(1, 7)])
+        index_get = index.get
+        lines = f.readlines(_BUFFER)
+        while len(lines) > 0:
+            for line in b''.join(lines).splitlines():
+                key = line.split(b'\t', 1)[0]
+
+                # Test if this is a duplicate entry (single hash lookup)
+                i = index_get(key)
+                if i is not None:
+
+                    # If so, parse only the two conflicting rows and combine
+                    conflicts += 1
+                    rows[i] = _merge_rows(rows[i], line, feas_pick, col_pick)
+
                 else:
-                    dic[row[0]] = ([max(dic[row[0]][0], row[1])] +
-                       [min(dic[row[0]][i], row[i+1]) for i in range(1, 7)])
+                    # If not, simply add the entry as is
+                    index[key] = len(rows)
+                    rows.append(line)
 
-            else:
-                # If not, simply add the entry
-                dic[row[0]] = row[1:]
+            lines = f.readlines(_BUFFER)
 
         print("Log 2 read.")
 
-    print("Combined log contains "+str(len(dic))+" entries ("+str(conflicts)+
-                                       " conflicting entries resolved).")
-
-    # Write output log
-    with open(log_out, 'w') as f:
-        print(comment[:-1], file=f)
+    print("Combined log contains %d entries (%d conflicting entries resolved)."
+          % (len(rows), conflicts))
 
-        for key in dic:
-            line = key + '\t' + str(dic[key][0]) + '\t'
-            for e in dic[key][1:]:
-                line += str("%.15f"%e) + '\t'
-            print(line, file=f)
+    # Write output log, joining the rows in batches
+    with open(log_out, 'wb', buffering=_BUFFER) as f:
+        f.write(comment.rstrip(b'\r\n') + b'\n')
+        for i in range(0, len(rows), _BATCH):
+            f.write(b'\n'.join(rows[i:i+_BATCH]) + b'\n')
 
         print("Output log written.")
 
 #==============================================================================
-def feasibility_update(log_in, user_cost, log_out):
+def _feasibility_chunk(lines, weights, bound):
+    """Re-evaluates the feasibility of a chunk of solution log lines.
+
+    Requires the following positional arguments:
+        lines -- List of solution log lines (as bytes).
+        weights -- List of user cost component weights.
+        bound -- User cost bound for feasibility.
+
+    Returns the re-evaluated lines joined into a single bytes object. Logged
+    values are copied verbatim, and entries with unknown (-1) feasibility are
+    left unchanged.
+    """
+
+    elements = len(weights)
+    out = []
+
+    # Bind globals and methods to locals once rather than once per line
+    split = bytes.split
+    sum_ = sum
+    map_ = map
+    float_ = float
+    mul = operator.mul
+    extend = out.extend
+
+    for line in lines:
+        key, feas, rest = split(line, b'\t', 2)
+
+        # Re-evaluate the feasibility of the solution
+        if feas != b"-1":
+            values = split(rest, b'\t', elements+1)
+            uc = sum_(map_(mul, weights, map_(float_, values[1:1+elements])))
+            if uc <= bound:
+                feas = b"1"
+            else:
+                feas = b"0"
+
+        # Collect the row's pieces to be joined once for the whole chunk
+        extend((key, b'\t', feas, b'\t', rest))
+
+    return b''.join(out)
+
+#==============================================================================
+def feasibility_update(log_in, user_cost, log_out, processes=1):
     """Re-evaluates feasibility of a solution log given a user cost file.
 
     Requires the following positional arguments:
@@ -134,6 +445,15 @@ def feasibility_update(log_in, user_cost, log_out):
         user_cost -- File path to an updated user cost data file.
         log_out -- File path for the re-evaluated solution log.
 
+    Accepts the following optional keyword arguments:
+        processes -- Number of worker processes to use for re-evaluating the
+            log. Defaults to 1, which processes the log in the calling
+            process. Values above 1 split the log into chunks that are
+            re-evaluated in parallel (on platforms that spawn worker
+            processes, e.g. Windows and macOS, this requires the calling
+            script to be guarded by "if __name__ == '__main__':"). None uses
+            one process per CPU.
+
     This function allows the solution log from one trial set to be used in
     another, as long as only the user cost parameters have changed. Because the
     solution logs record the user cost components rather than the final value,
@@ -146,7 +466,9 @@ def feasibility_update(log_in, user_cost, log_out):
     processed and each entry's feasibility status is re-evaluated according to
     the new user cost function definition. The output log consists of a copy of
     the input solution log, but with feasibility values that reflect the given
-    user cost parameters.
+    user cost parameters. The log is processed line-by-line, so it need not
+    fit in memory. Rows are not compared with each other, so a solution
+    repeated in the input log is repeated in the output log as well.
     """
 
     # Read user cost data
@@ -164,44 +486,37 @@ def feasibility_update(log_in, user_cost, log_out):
 
         print("User cost file read.")
 
-    # Initialize comment line and solution dictionary
-    comment = ""
-    dic = {}
-
-    # Read solution log into dictionary
-    with open(log_in, 'r') as f:
-
-        comment = f.readline() # get comment line
-
-        for line in f:
-            row = line.split()
-            dic[row[0]] = [int(row[1]), float(row[2]), float(row[3]),
-               float(row[4]), float(row[5]), float(row[6]), float(row[7])]
-
-        print("Solution log read.")
-
-    # Process the solution log while writing new results
-    with open(log_out, 'w') as f:
-        print(comment[:-1], file=f)
-
-        for key in dic:
-            # Re-evaluate the feasibility of the solution
-            if dic[key][0] != -1:
-                uc = 0
-                for i in range(elements):
-                    uc += weights[i] * dic[key][2+i]
-                if uc <= (1 + percent) * initial:
-                    dic[key][0] = 1
-                else:
-                    dic[key][0] = 0
+    # User cost bound for feasibility
+    bound = (1 + percent) * initial
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    # Process the solution log chunk-by-chunk while writing new results
+    with open(log_in, 'rb', buffering=_BUFFER) as fi:
+        with open(log_out, 'wb', buffering=_BUFFER) as fo:
+
+            fo.write(fi.readline().rstrip(b'\r\n') + b'\n') # copy comment line
+
+            if processes > 1:
+                # Hand chunks to worker processes, keeping a bounded number in
+                # flight so that memory use stays independent of log size
+                with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+                    pending = collections.deque()
+                    lines = fi.readlines(_BUFFER)
+                    while len(lines) > 0 or len(pending) > 0:
+                        while len(lines) > 0 and len(pending) < 2*processes:
+                            pending.append(pool.submit(_feasibility_chunk,
+                                                       lines, weights, bound))
+                            lines = fi.readlines(_BUFFER)
+                        fo.write(pending.popleft().result())
+            else:
+                lines = fi.readlines(_BUFFER)
+                while len(lines) > 0:
+                    fo.write(_feasibility_chunk(lines, weights, bound))
+                    lines = fi.readlines(_BUFFER)
 
-            # Write solution line to output log
-            line = key + '\t' + str(dic[key][0]) + '\t'
-            for e in dic[key][1:]:
-                line += str("%.15f"%e) + '\t'
-            print(line, file=f)
-
-        print("Output log written.")
+            print("Output log written.")
 
 #==============================================================================
 def expand_solution(log_in, log_out, elements):
@@ -215,39 +530,29 @@ def expand_solution(log_in, log_out, elements):
     This is meant for converting an existing solution log to one that includes
     additional solution vector elements. All new solution vector elements are
     assumed to go at the end of the solution vector and are assumed to take
-    initial values of 0.
+    initial values of 0. The log is processed line-by-line, so it need not fit
+    in memory. Rows are not compared with each other, so a solution repeated
+    in the input log is repeated in the output log as well.
     """
 
-    # Initialize comment line and solution dictionary
-    comment = ""
-    dic = {}
-
-    # Read solution log into dictionary
-    with open(log_in, 'r') as f:
-
-        comment = f.readline() # get comment line
-
-        for line in f:
-            row = line.split()
-            dic[row[0]] = [int(row[1]), float(row[2]), float(row[3]),
-               float(row[4]), float(row[5]), float(row[6]), float(row[7])]
+    suffix = b"_0"*elements # zero elements to append to every solution
 
-        print("Solution log read.")
+    # Process the solution log chunk-by-chunk while writing the updated log
+    with open(log_in, 'rb', buffering=_BUFFER) as fi:
+        with open(log_out, 'wb', buffering=_BUFFER) as fo:
 
-    # Write output log
-    with open(log_out, 'w') as f:
-        print(comment[:-1], file=f)
+            fo.write(fi.readline().rstrip(b'\r\n') + b'\n') # copy comment line
 
-        for key in dic:
-            line = key
-            for i in range(elements):
-                line += "_0"
-            line += '\t' + str(dic[key][0]) + '\t'
-            for e in dic[key][1:]:
-                line += str("%.15f"%e) + '\t'
-            print(line, file=f)
+            lines = fi.readlines(_BUFFER)
+            while len(lines) > 0:
+                # Insert the suffix before each row's first tab
+                fo.write(b''.join(map(bytes.replace, lines,
+                                      itertools.repeat(b'\t'),
+                                      itertools.repeat(suffix + b'\t'),
+                                      itertools.repeat(1))))
+                lines = fi.readlines(_BUFFER)
 
-        print("Output log written.")
+            print("Output log written.")
 
 #==============================================================================
 def contract_solution(log_in, log_out, elements):
@@ -261,50 +566,40 @@ def contract_solution(log_in, log_out, elements):
     Similar to the expansion function, this rewrites an existing solution log
     to remove a specified number of elements from the end of the solution
     vector. If all removed elements are zero, then the log entry may be kept,
-    but if any are nonzero the log entry must be discarded.
+    but if any are nonzero the log entry must be discarded. The log is
+    processed line-by-line, so it need not fit in memory. Rows are not
+    compared with each other, so a solution repeated in the input log is
+    repeated in the output log as well.
     """
 
-    # Initialize comment line and solution dictionary
-    comment = ""
-    dic = {}
-    dropped = 0 # number of dropped elements
+    zeros = [b'0']*elements # truncated elements of a kept solution
+    dropped = 0 # number of dropped solutions
 
-    # Read solution log into dictionary (while truncating solutions)
-    with open(log_in, 'r') as f:
+    # Process the solution log chunk-by-chunk while writing the updated log
+    with open(log_in, 'rb', buffering=_BUFFER) as fi:
+        with open(log_out, 'wb', buffering=_BUFFER) as fo:
 
-        comment = f.readline() # get comment line
+            fo.write(fi.readline().rstrip(b'\r\n') + b'\n') # copy comment line
 
-        for line in f:
-            row = line.split()
-            solvec = _str2vec(row[0])
-
-            # Skip solutions with nonzero elements in the tail
-            sum = 0
-            for n in solvec[-elements:]:
-                sum += abs(n)
-            if sum > 0:
-                dropped += 1
-                continue
-
-            # Add truncated solution to dictionary
-            dic[_vec2str(solvec[:-elements])] = [int(row[1]), float(row[2]),
-                float(row[3]), float(row[4]), float(row[5]), float(row[6]),
-                float(row[7])]
-
-        print("Solution log read.")
-        print("Dropped "+str(dropped)+" solutions.")
-
-    # Write output log
-    with open(log_out, 'w') as f:
-        print(comment[:-1], file=f)
-
-        for key in dic:
-            line = key + '\t' + str(dic[key][0]) + '\t'
-            for e in dic[key][1:]:
-                line += str("%.15f"%e) + '\t'
-            print(line, file=f)
+            lines = fi.readlines(_BUFFER)
+            while len(lines) > 0:
+                kept = []
+                for line in lines:
+                    # Split the truncated tail from the solution string only
+                    key, tab, rest = line.partition(b'\t')
+                    parts = key.rsplit(b'_', elements)
 
-        print("Output log written.")
+                    # Keep only solutions whose truncated elements are all zero
+                    if parts[1:] == zeros:
+                        kept += (parts[0], tab, rest)
+                    else:
+                        dropped += 1
+
+                fo.write(b''.join(kept))
+                lines = fi.readlines(_BUFFER)
+
+            print("Dropped %d solutions." % dropped)
+            print("Output log written.")
 
 #==============================================================================
 def clear_unknown(log_in, log_out):
@@ -321,53 +616,334 @@ def clear_unknown(log_in, log_out):
     This should have a minimal effect on the solution time since the objective
     function takes so little time to evaluate.
 
-    This script simply reads the input log while writing to the output log,
-    skipping lines with an unknown (-1) feasibility status.
+    This script scans the input log while writing to the output log, skipping
+    lines with an unknown (-1) feasibility status. The input log is memory
+    mapped and scanned at the byte level, and each run of consecutive kept
+    lines is copied to the output log with a single write.
     """
 
-    # Read input log while writing to output log
-    with open(log_in, 'r') as fi:
-        with open(log_out, 'w') as fo:
+    with open(log_in, 'rb') as fi:
+        with open(log_out, 'wb', buffering=_BUFFER) as fo:
+
+            size = os.fstat(fi.fileno()).st_size
+
+            # Empty files cannot be mapped (and have nothing to clear)
+            if size == 0:
+                fo.write(b'\n') # empty comment line
+                print("Solution log processed.")
+                return
+
+            with mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
+                # Copy the comment line, then start after it
+                nl = mm.find(b'\n')
+                pos = size if nl < 0 else nl + 1
+                fo.write(mm[:pos].rstrip(b'\r\n') + b'\n')
 
-            print(fi.readline()[:-1], file=fo) # rewrite comment line
+                run = pos # start of the current run of kept lines
 
-            # Process input log line-by-line
-            for line in fi:
-                row = line.split()
+                # Process input log line-by-line
+                while pos < size:
+                    nl = mm.find(b'\n', pos)
+                    end = size if nl < 0 else nl + 1
 
-                # Write only entries with known feasibility
-                if (int(row[1]) != -1):
-                    print(line[:-1], file=fo)
+                    # Feasibility token follows the first tab, and since it
+                    # is always -1, 0, or 1 its first byte is '-' only for
+                    # unknown entries
+                    tab = mm.find(b'\t', pos, end)
+
+                    # Drop entries with unknown feasibility
+                    if 0 <= tab < end-1 and mm[tab+1] == 0x2d:
+                        fo.write(mm[run:pos])
+                        run = end
+
+                    pos = end
+
+                # Write the final run of kept lines
+                fo.write(mm[run:size])
 
             print("Solution log processed.")
 
 #==============================================================================
-def lookup(log, sol):
+def log_pack(log_in, log_out):
+    """Converts a solution log into a packed binary solution log.
+
+    Requires the following positional arguments:
+        log_in -- File path to an existing solution log to be packed.
+        log_out -- File path for the packed solution log.
+
+    The packed log stores the solution log column-by-column in binary form, so
+    that the real-valued columns take 8 bytes per value (rather than about 20
+    characters of text) and can be reloaded without any text parsing. Packed
+    logs are only meant for storing and reloading logs between trials, since
+    the solution algorithm itself reads and writes plain text logs. See
+    log_unpack() for the reverse conversion.
+    """
+
+    comment, keys, feas, cols = _read_log(log_in)
+
+    print("Solution log read.")
+
+    _write_packed(log_out, comment, keys, feas, cols)
+
+#==============================================================================
+def log_unpack(log_in, log_out):
+    """Converts a packed binary solution log back into a solution log.
+
+    Requires the following positional arguments:
+        log_in -- File path to an existing packed solution log.
+        log_out -- File path for the unpacked solution log.
+
+    This reverses log_pack(), producing a plain text solution log in the usual
+    format.
+    """
+
+    comment, keys, feas, cols = _read_packed(log_in)
+
+    print("Packed log read.")
+
+    _write_log(log_out, comment, keys, feas, cols)
+
+#==============================================================================
+def _log_offsets(log):
+    """Indexes the rows of a solution log by solution string.
+
+    Requires a positional argument for the solution log file path.
+
+    Returns a dictionary mapping each solution string (as bytes) to the byte
+    offset of the first row of the log containing it. The result for the most
+    recently indexed log is cached in _offsets and reused until the file's
+    size or modification time changes.
+    """
+
+    stat = os.stat(log)
+    signature = (stat.st_size, stat.st_mtime_ns)
+
+    # Reuse the cached index if the log is unchanged
+    cached = _offsets.get(log)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    # Scan the log once, recording the offset of each row
+    index = {}
+    with open(log, 'rb') as f:
+
+        pos = len(f.readline()) # skip comment line
+
+        # Bind methods to locals once rather than once per line
+        setdefault = index.setdefault
+        find = bytes.find
+        len_ = len
+
+        for line in f:
+            setdefault(line[:find(line, b'\t')], pos)
+            pos += len_(line)
+
+    _offsets.clear() # keep only one log's index in memory
+    _offsets[log] = (signature, index)
+
+    return index
+
+#==============================================================================
+def lookup(log, sol, cache=False):
     """Looks up a solution.
 
     Requires the following positional arguments:
         log -- File path to an existing solution log.
         sol -- Solution string.
 
+    Accepts the following optional keyword arguments:
+        cache -- Selects whether to index the log for repeated lookups. If
+            True, the first lookup scans the whole log to record the position
+            of every row, and later lookups in the same (unchanged) log read
+            only the requested row (only the most recently indexed log is
+            kept). If False, the log is searched directly without building
+            an index, which is faster for a single lookup. Defaults to False.
+
     Returns a list containing the contents of the solution log's row for the
     given solution.
     """
 
-    # Read log
-    with open(log, 'r') as f:
+    key = sol.encode()
+
+    with open(log, 'rb') as f:
+
+        # Find the offset of the solution's row
+        if cache:
+            pos = _log_offsets(log).get(key, -1)
+
+            # Rescan if the cached offset no longer points at the solution
+            # (the log was rewritten without changing its size or time stamp);
+            # a miss is not rechecked, so a solution added by such a rewrite
+            # is reported as not found until the index is rebuilt
+            if pos >= 0:
+                f.seek(pos)
+                if not f.readline().startswith(key + b'\t'):
+                    del _offsets[log]
+                    pos = _log_offsets(log).get(key, -1)
+        elif os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = mm.find(b'\n' + key + b'\t')
+                if pos >= 0:
+                    pos += 1
+        else:
+            pos = -1
+
+        if pos < 0:
+            print("Solution not found.")
+            return
+
+        # Read the solution's row
+        f.seek(pos)
+        row = f.readline().split()
+
+        print ("Solution found:")
+        return [int(row[1]), float(row[2]), float(row[3]), float(row[4]),
+                float(row[5]), float(row[6]), float(row[7])]
 
-        for line in f:
-            row = line.split()
+#==============================================================================
+def _find_row(f, marker):
+    """Finds the first row of a file that begins with a given byte string.
 
-            if row[0] != sol:
-                continue
-            else:
-                print ("Solution found:")
-                return [int(row[1]), float(row[2]), float(row[3]),
-                        float(row[4]), float(row[5]), float(row[6]),
-                        float(row[7])]
+    Requires the following positional arguments:
+        f -- File opened in binary mode, positioned where the search should
+            begin.
+        marker -- Byte string made up of a newline followed by the beginning of
+            the row to find (so that the first line of the file is never
+            matched).
+
+    Returns a tuple containing the byte offsets of the start and the end of
+    the row (the end including its newline, if any), or None if no row
+    matches.
+
+    The file is read in large blocks, each searched with a single find() call,
+    so no per-line work is done while searching.
+    """
 
-        print("Solution not found.")
+    pos = f.tell() # file offset of the start of buf
+    buf = b''
+
+    while True:
+        block = f.read(_BUFFER)
+        buf += block
+
+        start = buf.find(marker)
+        if start >= 0:
+            # Keep reading until the end of the row is found
+            end = buf.find(b'\n', start+1)
+            if end >= 0:
+                return pos + start + 1, pos + end + 1
+            if len(block) == 0:
+                return pos + start + 1, pos + len(buf)
+            continue
+
+        if len(block) == 0:
+            return None
+
+        # Keep only the bytes that could still begin a match
+        cut = max(len(buf) - len(marker) + 1, 0)
+        pos += cut
+        buf = buf[cut:]
+
+#==============================================================================
+def _seek_iteration(f, iteration):
+    """Finds a position shortly before a given iteration of an event log.
+
+    Requires the following positional arguments:
+        f -- Event log file opened in binary mode.
+        iteration -- Iteration number to find.
+
+    Returns a byte offset from which a forward search will reach the row of
+    the given iteration, assuming that the log's rows are in increasing order
+    of iteration number (as written by the solution algorithm).
+
+    Rather than reading the log from the start, this bisects the file by
+    seeking to a position, skipping the partial row there, and reading the
+    iteration number of the next row. Bisection stops once the remaining
+    range fits in a single read block, so only a few small reads are needed
+    regardless of the size of the log.
+    """
+
+    lo = 0
+    hi = os.fstat(f.fileno()).st_size
+
+    while hi - lo > _BUFFER:
+        mid = (lo + hi) // 2
+
+        # Read the iteration number of the first full row after mid
+        f.seek(mid)
+        f.readline()
+        try:
+            current = int(f.readline().split(b'\t', 1)[0])
+        except ValueError:
+            current = None
+
+        if current is not None and current < iteration:
+            lo = mid
+        else:
+            hi = mid
+
+    return lo
+
+#==============================================================================
+def _advise(f, advice, offset=0, length=0):
+    """Tells the OS how a file is about to be accessed, where supported.
+
+    Requires the following positional arguments:
+        f -- Open file.
+        advice -- Name of an os.POSIX_FADV_* constant (e.g.
+            "POSIX_FADV_SEQUENTIAL").
+
+    Accepts the following optional keyword arguments:
+        offset -- Start of the byte range the advice applies to. Defaults to 0.
+        length -- Length of the byte range, with 0 meaning the rest of the
+            file. Defaults to 0.
+
+    This is only a hint (e.g. to read ahead more aggressively), so it does
+    nothing on platforms without posix_fadvise(), such as Windows.
+    """
+
+    if hasattr(os, 'posix_fadvise') and hasattr(os, advice):
+        os.posix_fadvise(f.fileno(), offset, length, getattr(os, advice))
+
+#==============================================================================
+def _copy_prefix(fi, fo, size):
+    """Copies the beginning of one file into another.
+
+    Requires the following positional arguments:
+        fi -- Input file opened in binary mode.
+        fo -- Output file opened in binary mode, with nothing written yet.
+        size -- Number of bytes to copy from the start of the input file.
+
+    Where available (e.g. Linux), os.sendfile() is used so that the copy takes
+    place within the kernel without passing through Python. Otherwise, or if
+    the platform refuses a file-to-file sendfile(), the remaining bytes are
+    copied in large blocks.
+    """
+
+    copied = 0
+
+    # Copy within the kernel if possible
+    if hasattr(os, 'sendfile'):
+        fo.flush()
+        try:
+            while copied < size:
+                sent = os.sendfile(fo.fileno(), fi.fileno(), copied,
+                                   size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError:
+            pass
+
+    # Copy any remaining bytes in large blocks
+    fi.seek(copied)
+    while copied < size:
+        block = fi.read(min(size - copied, _BUFFER))
+        if len(block) == 0:
+            break
+        fo.write(block)
+        copied += len(block)
 
 #==============================================================================
 def rewind(iteration, event_in, event_out, memory_in, memory_out):
@@ -399,84 +975,89 @@ def rewind(iteration, event_in, event_out, memory_in, memory_out):
     obj = 0 # current objective
     tenure = 0 # current tabu tenure
     temperature = 0 # current SA temperature
-    sol = [] # current solution vector
+    sol = "" # current solution string
     sol_size = 0 # size of solution vector
 
-    # Read input event log while writing to output event log
-    first = True
-    with open(event_in, 'r') as fi:
-        with open(event_out, 'w') as fo:
-
-            # Process input log line-by-line
-            for line in fi:
-
-                # Reproduce line in output log
-                print(line[:-1], file=fo)
-
-                # If this is the first row, skip the rest
-                if first == True:
-                    first = False
-                    continue
-
-                # On the final used line, gather information and then break
-                row = line.split()
-                if int(row[0]) == iteration-1:
-                    obj = float(row[1])
-                    tenure = float(row[9])
-                    temperature = float(row[10])
-                    sol = _str2vec(row[-1])
-                    sol_size = len(sol)
-                    break
+    # Locate the final used row of the event log
+    with open(event_in, 'rb') as fi:
+
+        marker = b'\n' + str(iteration-1).encode() + b'\t'
+
+        # Seek close to the row first, falling back on a full scan
+        fi.seek(_seek_iteration(fi, iteration-1))
+        span = _find_row(fi, marker)
+        if span is None:
+            fi.seek(0)
+            span = _find_row(fi, marker)
+
+        # Gather information from the row
+        if span is not None:
+            fi.seek(span[0])
+            line = fi.read(span[1]-span[0]).rstrip()
+
+            # Split off only the leading fields needed and the final field
+            row = line.split(b'\t', 11)
+            obj = float(row[1])
+            tenure = float(row[9])
+            temperature = float(row[10])
+            sol = line[line.rfind(b'\t')+1:].decode()
+            sol_size = sol.count('_') + 1
+            end = span[1]
+        else:
+            end = os.fstat(fi.fileno()).st_size
+
+        # Copy the event log up to and including that row
+        _advise(fi, "POSIX_FADV_SEQUENTIAL", 0, end)
+        with open(event_out, 'wb', buffering=_BUFFER) as fo:
+            _copy_prefix(fi, fo, end)
+
+            # The copy will not be read again, so release its cached pages
+            fo.flush()
+            _advise(fo, "POSIX_FADV_DONTNEED")
 
             print("Event log processed.")
 
     # Read input memory log while writing to output memory log
-    first = True
     with open(memory_in, 'r') as fi:
-        with open(memory_out, 'w') as fo:
+        with open(memory_out, 'w', buffering=_BUFFER) as fo:
+
+            parts = [] # lines of the output memory log
 
             # Comment line
-            print(fi.readline()[:-1], file=fo)
+            parts.append(fi.readline().rstrip('\r\n'))
 
             # Tabu tenures
-            line = ""
-            zero = 0.0
-            for i in range(sol_size):
-                line += str("%.15f"%zero) + '\t'
-            print(line, file=fo)
-            print(line, file=fo)
-
-            # Solutions
-            line = ""
-            for n in sol:
-                line += str(n) + '\t'
-            print(line, file=fo)
-            print(line, file=fo)
+            line = ("%.15f\t"%0.0)*sol_size # all zero, so format only once
+            parts.append(line)
+            parts.append(line)
+
+            # Solutions (also used for the attractive set)
+            sol_line = sol.replace('_', '\t') + '\t' if sol_size > 0 else ""
+            parts.append(sol_line)
+            parts.append(sol_line)
 
             # Objective
             line = str("%.15f"%obj)
-            print(line, file=fo)
-            print(line, file=fo)
+            parts.append(line)
+            parts.append(line)
 
             # Iteration
-            print(iteration, file=fo)
+            parts.append(str(iteration))
 
             # Nonimprovement counters
-            print(0, file=fo)
-            print(0, file=fo)
+            parts.append("0")
+            parts.append("0")
 
             # Tenure and temperature
-            line = str("%.15f"%tenure)
-            print(tenure, file=fo)
-            line = str("%.15f"%temperature)
-            print(temperature, file=fo)
+            parts.append(str(tenure))
+            parts.append(str(temperature))
 
             # Attractive set
             line = str("%.15f"%obj) + '\t'
-            print(line, file=fo)
-            line = ""
-            for n in sol:
-                line += str(n) + '\t'
-            print(line, file=fo)
+            parts.append(line)
+            parts.append(sol_line)
+
+            # Write the whole memory log at once
+            fo.write('\n'.join(parts) + '\n')
 
             print("Memory log processed.")